@@ -111,6 +111,18 @@ class DygraphShardingOptimizer:
         self._rank2params = self._partition_parameters()
         self._param2rank = self._map_param_to_rank()
 
+        self._broadcast_overlap = False
+        self._forward_pre_hook_remove_helper = []
+        try:
+            # The fp32 params such as layer_norm_0.w_0 will be at the end of param_list.
+            # Have to sort the params to make sure all params are in the forward using order.
+            self._broadcast_order_params = sorted(
+                self._parameter_list,
+                key=lambda x: int(x.name.split('.')[0].split('_')[-1]),
+            )
+        except ValueError:
+            self._broadcast_order_params = None
+
         if not self.tensor_fusion and not self.comm_overlap:
             local_params = self._rank2params[self._sharding_rank]
             self._set_inner_opt_attr('_parameter_list', local_params)
@@ -311,11 +323,81 @@ class DygraphShardingOptimizer:
                             sync_op=True,
                         )
 
+    def _set_broadcast_overlap(self, broadcast_overlap, layers=None):
+        # Enable the post optimizer broadcasts to overlap with the forward
+        # calculation of the next batch.
+        self._broadcast_overlap = broadcast_overlap
+        if self._broadcast_overlap:
+            assert (
+                not self.tensor_fusion
+            ), "Do not support broadcast overlap with tensor fusion now."
+            assert (
+                layers is not None
+            ), "To enable broadcast overlap forward, please pass the module to the function."
+            self._layers = layers
+            warnings.warn(
+                "Setting overlap broadcast means the `paddle.device.cuda.synchronize()` "
+                "must be called manually before calling `paddle.save()` and before and inference."
+            )
+            if self._broadcast_order_params is None:
+                # Params' names should be like column_linear_32.w_0 patter to get the best performance.
+                warnings.warn(
+                    r"The param name passed to the optimizer doesn't follow .+_[0-9]+\..+ patter, "
+                    "overlap broadcast may harm the performance."
+                )
+                self._broadcast_order_params = self._parameter_list
+
+    def _forward_pre_hook_function(self, tasks):
+        # Since the layers will call pre hook by `forward_pre_hook(self, inputs)`,
+        # the helper functions needs the x and y to take those params.
+        def __impl__(x, y):
+            for task in tasks:
+                # Wait for broadcast task before using the result of the broadcast.
+                task.wait()
+
+        return __impl__
+
+    @imperative_base.no_grad
+    def _broadcast_params_overlap_forward(self):
+        # Exchange all the shards with the other ranks, but overlap the
+        # broadcasts with the forward calculation of the next batch.
+        group = self._hcg.get_sharding_parallel_group()
+        param2task = {}
+        for param in self._broadcast_order_params:
+            if param.trainable:
+                task = paddle.distributed.broadcast(
+                    param,
+                    # the collective API need src rank to be the global rank id
+                    # instead of the relative logic rank id within group
+                    src=group.ranks[self._param2rank[param.name]],
+                    group=group,
+                    sync_op=False,
+                )
+                assert param.name not in param2task
+                param2task[param.name] = task
+
+        for layer in self._layers.sublayers():
+            if len(layer.sublayers()) == 0:
+                # Register forward pre hook for leaf layers. This will get the best performance.
+                tasks = []
+                for param in layer.parameters():
+                    if param.trainable:
+                        if param.name in param2task:
+                            tasks.append(param2task[param.name])
+                self._forward_pre_hook_remove_helper.append(
+                    layer.register_forward_pre_hook(
+                        self._forward_pre_hook_function(tasks)
+                    )
+                )
+
     def _sharding_sync_parameters(self):
         """
         sync parameter across sharding group
         """
         # TODO speed up this functional
+        if self._broadcast_overlap:
+            self._broadcast_params_overlap_forward()
+            return
 
         with framework.no_grad():
             # TODO detach not need (?)
@@ -371,6 +453,11 @@ class DygraphShardingOptimizer:
     @framework.dygraph_only
     def step(self):
         # TODO Check whether the model trainable param changed and update state accordingly
+        if self._broadcast_overlap:
+            # Clear the pre forward hook in the optimizer step.
+            for hook_remove in self._forward_pre_hook_remove_helper:
+                hook_remove.remove()
+            self._forward_pre_hook_remove_helper = []
 
         # hack to grad_clip all parameters,
         # otherwise the self._inner_opt will only grad_clip the self._rank2params[self._sharding_rank] params
@@ -97,14 +97,70 @@ class MixPrecisionLayer(nn.Layer):
         )
 
 
+def _pack_fp32_master(tensor):
+    """Split a fp32 tensor into its bf16 high half and residual low half,
+    stored as two contiguous int16 planes."""
+    i16 = paddle.view(tensor.flatten(), "int16").reshape([-1, 2])
+    # little-endian layout: index 0 holds the low 16 bits of each fp32
+    # element, index 1 the high (bf16) 16 bits
+    return i16[:, 1].clone(), i16[:, 0].clone()
+
+
+def _unpack_fp32_master(hi, lo, shape):
+    """Reassemble the fp32 tensor from its int16 planes; the round trip
+    is bitwise exact."""
+    interleaved = paddle.stack([lo, hi], axis=-1).flatten()
+    return paddle.view(interleaved, "float32").reshape(shape)
+
+
 class MixPrecisionOptimizer:
-    def __init__(self, optimizer):
+    def __init__(self, optimizer, packed=False):
         self._inner_opt = optimizer
         self._parameter_list = obtain_optimizer_parameters_list(optimizer)
+        # When packed, the fp32 master weights held by the inner optimizer
+        # are kept between steps as two int16 planes (bf16 high half plus
+        # residual low half) in a structure-of-arrays layout, so consumers
+        # that only need the bf16 part read half the bytes. The fp32
+        # values are reconstructed bit-exactly before every update.
+        self._packed = packed
+        self._packed_master_weights = {}
+
+    def _pack_master_weights(self):
+        master_weights = getattr(self._inner_opt, "_master_weights", None)
+        if not master_weights:
+            return
+        for name, master in list(master_weights.items()):
+            if master.dtype != paddle.float32:
+                continue
+            hi, lo = _pack_fp32_master(master)
+            self._packed_master_weights[name] = (
+                hi,
+                lo,
+                master.shape,
+                master.name,
+            )
+            del master_weights[name]
+
+    def _restore_master_weights(self):
+        if not self._packed_master_weights:
+            return
+        master_weights = self._inner_opt._master_weights
+        for name, (
+            hi,
+            lo,
+            shape,
+            var_name,
+        ) in self._packed_master_weights.items():
+            master = _unpack_fp32_master(hi, lo, shape)
+            master.name = var_name
+            master_weights[name] = master
+        self._packed_master_weights = {}
 
     @imperative_base.no_grad
     @framework.dygraph_only
     def step(self):
+        if self._packed:
+            self._restore_master_weights()
         if not isinstance(self._parameter_list[0], dict):
             params_grads = []
             for param in self._parameter_list:
@@ -168,6 +224,21 @@ class MixPrecisionOptimizer:
                     loss=None, startup_program=None, params_grads=params_grads
                 )
 
+        if self._packed:
+            self._pack_master_weights()
+
+    @framework.dygraph_only
+    def state_dict(self):
+        if self._packed:
+            self._restore_master_weights()
+        return self._inner_opt.state_dict()
+
+    @framework.dygraph_only
+    def set_state_dict(self, state_dict):
+        # drop any packed copies so they cannot shadow the loaded weights
+        self._packed_master_weights = {}
+        self._inner_opt.set_state_dict(state_dict)
+
     @framework.dygraph_only
     def clear_grad(self, set_to_zero=True):
         param_list = []
@@ -58,7 +58,7 @@ class RandomDataset(paddle.io.Dataset):
         return self.num_samples
 
 
-def create_optimizer(model, use_pure_bf16, use_main_grad):
+def create_optimizer(model, use_pure_bf16, use_main_grad, packed=False):
     if use_main_grad:
         assert use_pure_bf16
         model = mix_precision_utils.MixPrecisionLayer(model, dtype="bfloat16")
@@ -70,7 +70,9 @@ def create_optimizer(model, use_pure_bf16, use_main_grad):
         multi_precision=use_pure_bf16,
     )
     if use_main_grad:
-        optimizer = mix_precision_utils.MixPrecisionOptimizer(optimizer)
+        optimizer = mix_precision_utils.MixPrecisionOptimizer(
+            optimizer, packed=packed
+        )
 
     return optimizer
 
@@ -30,6 +30,20 @@ from paddle.distributed.fleet.utils.hybrid_parallel_util import (
 
 logging.basicConfig(level="INFO", format="%(message)s")
 
+# query the CUDA capability once at import; the answer cannot change
+# within a process
+_BF16_SUPPORTED = paddle.amp.is_bfloat16_supported()
+
+
+def _bf16_round_trip_transform(t, device, dtype, blocking):
+    # matches the transform signature expected by Layer._apply; truncates
+    # float32 tensors to bf16 precision in place
+    if t.dtype == paddle.float32:
+        t.set_value(
+            paddle.cast(paddle.cast(t, dtype='bfloat16'), dtype='float32')
+        )
+    return t
+
 
 def train_mlp(
     model, train_loader, use_pure_bf16=False, use_main_grad=False, acc_steps=1
@@ -38,8 +52,13 @@ def train_mlp(
         f"-- Train Info: use_pure_bf16={use_pure_bf16}, use_main_grad={use_main_grad}, acc_steps={acc_steps}"
     )
 
+    # store the fp32 master weights packed between steps; the round trip
+    # is bitwise exact, so the O1 vs O2 comparisons are unaffected
     optimizer = create_optimizer(
-        model=model, use_pure_bf16=use_pure_bf16, use_main_grad=use_main_grad
+        model=model,
+        use_pure_bf16=use_pure_bf16,
+        use_main_grad=use_main_grad,
+        packed=True,
     )
     if use_pure_bf16:
         level = 'O2'
@@ -59,11 +78,10 @@ def train_mlp(
     model = paddle.DataParallel(model)
 
     if not use_pure_bf16:
-        for param in model.parameters():
-            t = paddle.cast(
-                paddle.cast(param, dtype='bfloat16'), dtype='float32'
-            )
-            param.set_value(t)
+        # let the layer tree drive the truncation instead of a Python
+        # loop over model.parameters(); this also covers buffers and
+        # nested sublayers
+        model._apply(_bf16_round_trip_transform, None, "float32", None)
 
     local_rank = paddle.distributed.get_rank()
 
@@ -127,7 +145,7 @@ def train_mlp(
 
 
 def test_dp_bf16():
-    if not paddle.amp.is_bfloat16_supported():
+    if not _BF16_SUPPORTED:
         logging.info("BFloat16 is not supported!")
         return
 
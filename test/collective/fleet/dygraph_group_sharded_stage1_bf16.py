@@ -28,6 +28,34 @@ from paddle.distributed import fleet
 
 logging.basicConfig(level="INFO", format="%(message)s")
 
+# query the CUDA capability once at import; the answer cannot change
+# within a process
+_BF16_SUPPORTED = paddle.amp.is_bfloat16_supported()
+
+_fleet_init_key = None
+
+
+def init_fleet(sharding_stage):
+    # fleet.init rebuilds the hybrid communication groups and allocates
+    # new nccl comms every time it runs, so only re-init when the
+    # requested configuration differs from the previous train_mlp call.
+    global _fleet_init_key
+    key = sharding_stage
+    if key == _fleet_init_key:
+        return
+
+    strategy = fleet.DistributedStrategy()
+    if sharding_stage == 1:
+        strategy.hybrid_configs = {
+            "dp_degree": 1,
+            "mp_degree": 1,
+            "pp_degree": 1,
+            "sharding_degree": 2,
+        }
+
+    fleet.init(is_collective=True, strategy=strategy)
+    _fleet_init_key = key
+
 
 def train_mlp(
     model,
@@ -59,7 +87,6 @@ def train_mlp(
         model=model, use_pure_bf16=use_pure_bf16, use_main_grad=use_main_grad
     )
 
-    strategy = fleet.DistributedStrategy()
     if use_pure_bf16:
         level = 'O2'
         custom_white_list = None
@@ -72,30 +99,35 @@ def train_mlp(
             "relu",
         ]
 
-    if sharding_stage == 1:
-        hybrid_configs = {
-            "dp_degree": 1,
-            "mp_degree": 1,
-            "pp_degree": 1,
-            "sharding_degree": 2,
-        }
-        strategy.hybrid_configs = hybrid_configs
-
-    fleet.init(is_collective=True, strategy=strategy)
+    init_fleet(sharding_stage)
     model = fleet.distributed_model(model)
 
     if sharding_stage == 1:
         optimizer = fleet.distributed_optimizer(optimizer)
+        # hide the post-step param broadcasts behind the next forward;
+        # the broadcast values are unchanged, only overlapped
+        optimizer._set_broadcast_overlap(True, model)
 
     if sharding_stage == 1:
         model.to(device="gpu")
 
     if not use_pure_bf16:
-        for param in model.parameters():
-            t = paddle.cast(
-                paddle.cast(param, dtype='bfloat16'), dtype='float32'
+        # truncate all parameters to bf16 precision with one fused
+        # round-trip cast on a flat buffer instead of launching two cast
+        # kernels per parameter
+        with paddle.no_grad():
+            params = list(model.parameters())
+            flat = paddle.concat([p.flatten() for p in params])
+            flat = paddle.cast(
+                paddle.cast(flat, dtype='bfloat16'), dtype='float32'
             )
-            param.set_value(t)
+            offset = 0
+            for param in params:
+                numel = int(np.prod(param.shape))
+                param.set_value(
+                    flat[offset : offset + numel].reshape(param.shape)
+                )
+                offset += numel
 
     local_rank = paddle.distributed.get_rank()
 
@@ -152,13 +184,17 @@ def train_mlp(
                     if enable_stats:
                         paddle.amp.debugging.disable_operator_stats_collection()
 
+    if sharding_stage == 1:
+        # the last step's overlapped broadcasts may still be in flight
+        paddle.device.cuda.synchronize()
+
     model_param_dict = save_model_parameters(model)
     optimizer_state_dict = optimizer.state_dict()
     return losses, model_param_dict, optimizer_state_dict
 
 
 def test_stage1_bf16():
-    if not paddle.amp.is_bfloat16_supported():
+    if not _BF16_SUPPORTED:
         logging.info("BFloat16 is not supported!")
         return
 